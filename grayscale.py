@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Grayscale detection shared by the video and .pkg.slp resize scripts.
+
+A frame counts as grayscale when it is single-channel, or when it has
+3 channels whose B/G/R values are all within GRAY_TOLERANCE of each other.
+Frames with an alpha channel (4 channels) are never treated as grayscale.
+"""
+
+import cv2
+
+# Max per-pixel B/G/R difference for a frame to count as grayscale
+# (lossy JPEG/MPEG-4 chroma rounding shifts B/G/R by a few levels)
+GRAY_TOLERANCE = 4
+
+# Number of frames sampled across a video to decide if it is grayscale
+GRAY_SAMPLE_FRAMES = 20
+
+
+def is_gray_frame(frame):
+    """True if a decoded frame is single-channel or has B=G=R within GRAY_TOLERANCE."""
+    if frame.ndim == 2 or frame.shape[2] == 1:
+        return True
+    if frame.shape[2] != 3:
+        return False
+    b, g, r = cv2.split(frame)
+    return (cv2.absdiff(b, g).max() <= GRAY_TOLERANCE
+            and cv2.absdiff(b, r).max() <= GRAY_TOLERANCE)
+
+
+def is_flat_frame(frame):
+    """True if a frame is all black or a single flat value (no colour information)."""
+    return int(frame.max()) - int(frame.min()) <= GRAY_TOLERANCE
@@ -7,6 +7,11 @@ This script does THREE things:
   2. Resizes all embedded frame images to the new resolution
   3. Updates video dimension metadata in videos_json
 
+Each embedded video is first scanned frame by frame (see grayscale.py). If
+every frame is grayscale, the video is resized and re-encoded as
+single-channel images and marked as 1 channel in videos_json; otherwise all
+of its frames are re-encoded in colour.
+
 Usage:
   python rescale_pkg_slp.py input.pkg.slp output.pkg.slp
 
@@ -28,6 +33,49 @@ NEW_WIDTH = 3240
 NEW_HEIGHT = 2890
 
 
+def frame_to_bytes(raw):
+    if isinstance(raw, np.ndarray):
+        return raw.tobytes()
+    elif isinstance(raw, bytes):
+        return raw
+    else:
+        return bytes(raw)
+
+
+def read_video_channels(f):
+    """Return {video index: channels} from backend.shape in videos_json."""
+    channels = {}
+    if "videos_json" not in f:
+        return channels
+    raw = f["videos_json"]
+    for i in range(len(raw)):
+        entry = raw[i]
+        if isinstance(entry, bytes):
+            entry = entry.decode("utf-8")
+        data = json.loads(entry)
+        shape = data.get("backend", {}).get("shape")
+        if shape is not None and len(shape) >= 4 and shape[3] is not None:
+            channels[i] = int(shape[3])
+    return channels
+
+
+def convert_channels(img, channels, cv2):
+    """Convert a decoded image to 1 (gray), 3 (BGR) or 4 (BGRA) channels."""
+    n = 1 if img.ndim == 2 else img.shape[2]
+    if n == channels:
+        return img
+    if n == 1:
+        img = img.reshape(img.shape[:2])
+        if channels == 1:
+            return img
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA if channels == 4 else cv2.COLOR_GRAY2BGR)
+    if channels == 1:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if n == 4 else cv2.COLOR_BGR2GRAY)
+    if channels == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+
 def rescale_pkg_slp(input_path, output_path):
     scale_x = NEW_WIDTH / OLD_WIDTH
     scale_y = NEW_HEIGHT / OLD_HEIGHT
@@ -103,6 +151,7 @@ def rescale_pkg_slp(input_path, output_path):
 
         try:
             import cv2
+            from grayscale import is_gray_frame
             print("  Using OpenCV for image resizing")
         except ImportError:
             print("  ERROR: OpenCV not found! Install with:")
@@ -116,6 +165,12 @@ def rescale_pkg_slp(input_path, output_path):
 
         total_frames_resized = 0
 
+        # Channel count per video index from videos_json, and the channel
+        # count actually encoded for each resized video (used in Step 3)
+        video_channels = read_video_channels(f)
+        encoded_channels = {}
+        n_videos = len(f["videos_json"]) if "videos_json" in f else 0
+
         if cv2 is not None:
             for vg_name in video_groups:
                 vg = f[vg_name]
@@ -137,6 +192,17 @@ def rescale_pkg_slp(input_path, output_path):
                 if isinstance(img_format, bytes):
                     img_format = img_format.decode("utf-8")
 
+                # Group "video<N>" is entry N in videos_json; without that link
+                # the metadata cannot be updated, so channels are left as stored
+                video_idx = int(vg_name[5:]) if vg_name[5:].isdigit() else None
+                if video_idx is not None and video_idx >= n_videos:
+                    video_idx = None
+                meta_channels = video_channels.get(video_idx)
+                if img_format.lower() in ("jpg", "jpeg"):
+                    ext = ".jpg"
+                else:
+                    ext = ".png"
+
                 print("  " + vg_name + ": " + str(n_frames) + " frames, format=" + img_format)
 
                 # Save all attributes before deleting
@@ -155,23 +221,51 @@ def rescale_pkg_slp(input_path, output_path):
                     for attr_name in parent_group["source_video"].attrs:
                         saved_source_video_attrs[attr_name] = parent_group["source_video"].attrs[attr_name]
 
-                # Read all frames, decode, resize, re-encode
+                # Pass 1: decode and classify every frame, so the channel
+                # count of the whole video is known before anything is encoded
+                n_gray = 0
+                n_failed = 0
+                color_channels = None
+                for frame_i in range(n_frames):
+                    nparr = np.frombuffer(frame_to_bytes(ds[frame_i]), np.uint8)
+                    img = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
+                    if img is None:
+                        n_failed += 1
+                    elif is_gray_frame(img):
+                        n_gray += 1
+                    else:
+                        color_channels = max(color_channels or 0, img.shape[2])
+
+                # A video is single-channel only if every frame is gray.
+                # (Frames that cannot be decoded are kept as original bytes and
+                # are assumed to match the metadata channel count.)
+                if video_idx is None:
+                    print("    WARNING: " + vg_name + " has no videos_json index, keeping channels as stored")
+                    out_channels = None
+                elif n_gray == 0:
+                    out_channels = color_channels or meta_channels
+                elif color_channels is None and (n_failed == 0 or meta_channels == 1):
+                    out_channels = 1
+                else:
+                    out_channels = color_channels or meta_channels or 3
+                if video_idx is not None and out_channels is not None:
+                    encoded_channels[video_idx] = out_channels
+                if out_channels is None:
+                    print("    channels=unknown")
+                else:
+                    print("    channels=" + str(out_channels)
+                          + (" (grayscale)" if out_channels == 1 else ""))
+
+                # Pass 2: decode, convert to the video's channel count, resize,
+                # re-encode (each frame is encoded exactly once)
                 resized_frames = []
                 start_time = time.time()
 
                 for frame_i in range(n_frames):
                     raw = ds[frame_i]
 
-                    # Convert to bytes
-                    if isinstance(raw, np.ndarray):
-                        img_bytes = raw.tobytes()
-                    elif isinstance(raw, bytes):
-                        img_bytes = raw
-                    else:
-                        img_bytes = bytes(raw)
-
                     # Decode
-                    nparr = np.frombuffer(img_bytes, np.uint8)
+                    nparr = np.frombuffer(frame_to_bytes(raw), np.uint8)
                     img = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
 
                     if img is None:
@@ -179,14 +273,15 @@ def rescale_pkg_slp(input_path, output_path):
                         resized_frames.append(raw)
                         continue
 
+                    # Gray videos are resized and encoded as one channel
+                    if out_channels is not None:
+                        img = convert_channels(img, out_channels, cv2)
+
                     # Resize
                     resized = cv2.resize(img, (NEW_WIDTH, NEW_HEIGHT), interpolation=cv2.INTER_LINEAR)
 
                     # Re-encode
-                    if img_format.lower() in ("jpg", "jpeg"):
-                        success, encoded = cv2.imencode(".jpg", resized)
-                    else:
-                        success, encoded = cv2.imencode(".png", resized)
+                    success, encoded = cv2.imencode(ext, resized)
 
                     if success:
                         resized_frames.append(encoded.tobytes())
@@ -234,6 +329,8 @@ def rescale_pkg_slp(input_path, output_path):
                     new_ds.attrs["height"] = NEW_HEIGHT
                 if "width" in new_ds.attrs:
                     new_ds.attrs["width"] = NEW_WIDTH
+                if out_channels is not None and "channels" in new_ds.attrs:
+                    new_ds.attrs["channels"] = out_channels
 
                 print("  " + vg_name + ": done, " + str(n_frames) + " frames resized")
 
@@ -260,16 +357,23 @@ def rescale_pkg_slp(input_path, output_path):
                 short = filename.split("/")[-1] if "/" in filename else filename
 
                 # Update backend.shape: [frames, height, width, channels]
+                out_channels = encoded_channels.get(i)
                 if "backend" in data and "shape" in data["backend"]:
                     old_shape = data["backend"]["shape"]
                     new_shape = list(old_shape)
                     if len(new_shape) >= 3:
                         new_shape[1] = NEW_HEIGHT
                         new_shape[2] = NEW_WIDTH
+                    if len(new_shape) >= 4 and out_channels is not None:
+                        new_shape[3] = out_channels
                     data["backend"]["shape"] = new_shape
                     print("  Video " + str(i) + " (" + short + "): " + str(old_shape) + " -> " + str(new_shape))
                     videos_fixed += 1
 
+                # Keep the backend grayscale flag in line with the channel count
+                if out_channels is not None and "grayscale" in data.get("backend", {}):
+                    data["backend"]["grayscale"] = out_channels == 1
+
                 # Also update source_video if present
                 if "source_video" in data and data["source_video"] is not None:
                     sv = data["source_video"]
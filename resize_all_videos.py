@@ -1,6 +1,9 @@
 import cv2
+import numpy as np
 import os
 
+from grayscale import GRAY_SAMPLE_FRAMES, is_flat_frame, is_gray_frame
+
 # Kaynak klasör - şu anki dizin
 input_dir = r"X:\410SERV\AG0 McMahon\Özge\cutting_legs\C-"
 # Çıktı klasörü
@@ -40,14 +43,35 @@ for i, filepath in enumerate(video_files):
     print(f"[{i+1}/{len(video_files)}] {rel_path}")
     print(f"  {orig_w}x{orig_h} -> {TARGET_W}x{TARGET_H}, {total} frame, {fps:.1f} fps")
 
+    # Video boyunca yayılmış frame'leri örnekle: B, G, R kanalları aynıysa
+    # video gri tonlamalıdır. Siyah/düz frame'ler (fade-in, ışık kapalı,
+    # lens kapağı) oylamaya katılmaz. Karar tüm video için bir kez verilir.
+    is_gray = None
+    for k in np.linspace(0, max(total - 1, 0), GRAY_SAMPLE_FRAMES).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(k))
+        ret, frame = cap.read()
+        if not ret or is_flat_frame(frame):
+            continue
+        if not is_gray_frame(frame):
+            is_gray = False
+            break
+        is_gray = True
+    is_gray = bool(is_gray)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    print(f"  Kanal: {'1 (gri)' if is_gray else '3 (BGR)'}")
+
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    writer = cv2.VideoWriter(out_path, fourcc, fps, (TARGET_W, TARGET_H))
+    writer = cv2.VideoWriter(out_path, fourcc, fps, (TARGET_W, TARGET_H), isColor=not is_gray)
 
     count = 0
     while True:
         ret, frame = cap.read()
         if not ret:
             break
+        # Gri videoda resize ve encode tek kanal üzerinden yapılır
+        if is_gray:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         resized = cv2.resize(frame, (TARGET_W, TARGET_H), interpolation=cv2.INTER_LINEAR)
         writer.write(resized)
         count += 1
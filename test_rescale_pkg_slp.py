@@ -0,0 +1,140 @@
+import json
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+h5py = pytest.importorskip("h5py")
+
+import grayscale
+import rescale_pkg_slp
+
+
+def png(img):
+    success, encoded = cv2.imencode(".png", img)
+    assert success
+    return encoded.tobytes()
+
+
+def gray_img(seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (8, 8), dtype=np.uint8)
+
+
+def bgr_equal_img(seed, noise=0):
+    img = cv2.cvtColor(gray_img(seed), cv2.COLOR_GRAY2BGR).astype(np.int16)
+    img[:, :, 1] += noise
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def color_img(seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+
+
+def write_frames(f, name, frames):
+    vlen_dt = h5py.special_dtype(vlen=np.uint8)
+    ds = f.create_dataset(name + "/video", shape=(len(frames),), dtype=vlen_dt)
+    for frame_i, frame in enumerate(frames):
+        ds[frame_i] = np.frombuffer(frame, dtype=np.uint8)
+    ds.attrs["format"] = "png"
+
+
+def write_pkg(path, videos, grayscale_key=True, extra_groups=None):
+    with h5py.File(path, "w") as f:
+        videos_json = []
+        for i, frames in enumerate(videos):
+            write_frames(f, "video" + str(i), frames)
+            backend = {"shape": [len(frames), 8, 8, 3]}
+            if grayscale_key:
+                backend["grayscale"] = False
+            videos_json.append(json.dumps({"filename": "v" + str(i) + ".mp4", "backend": backend}))
+        for name, frames in (extra_groups or {}).items():
+            write_frames(f, name, frames)
+        f.create_dataset("videos_json", data=[s.encode("utf-8") for s in videos_json], maxshape=(None,))
+
+
+def read_pkg(path):
+    with h5py.File(path, "r") as f:
+        backends = [json.loads(entry)["backend"] for entry in f["videos_json"][:]]
+        frames = []
+        for i in range(len(backends)):
+            ds = f["video" + str(i) + "/video"]
+            frames.append([cv2.imdecode(ds[k], cv2.IMREAD_UNCHANGED) for k in range(ds.shape[0])])
+    return backends, frames
+
+
+@pytest.fixture
+def small_size(monkeypatch):
+    monkeypatch.setattr(rescale_pkg_slp, "OLD_WIDTH", 8)
+    monkeypatch.setattr(rescale_pkg_slp, "OLD_HEIGHT", 8)
+    monkeypatch.setattr(rescale_pkg_slp, "NEW_WIDTH", 16)
+    monkeypatch.setattr(rescale_pkg_slp, "NEW_HEIGHT", 12)
+
+
+def test_is_gray_frame():
+    assert grayscale.is_gray_frame(gray_img(0))
+    assert grayscale.is_gray_frame(bgr_equal_img(0))
+    assert grayscale.is_gray_frame(bgr_equal_img(0, noise=1))
+    assert not grayscale.is_gray_frame(bgr_equal_img(0, noise=10))
+    assert not grayscale.is_gray_frame(color_img(0))
+    assert not grayscale.is_gray_frame(cv2.cvtColor(bgr_equal_img(0), cv2.COLOR_BGR2BGRA))
+
+
+def test_is_flat_frame():
+    assert grayscale.is_flat_frame(np.zeros((8, 8, 3), dtype=np.uint8))
+    assert not grayscale.is_flat_frame(gray_img(0))
+
+
+def test_rescale_pkg_slp_channels(tmp_path, small_size):
+    all_gray = [png(gray_img(0))] + [png(bgr_equal_img(k, noise=1)) for k in range(1, 7)]
+    late_color = [png(gray_img(0))] + [png(bgr_equal_img(k)) for k in range(1, 7)] + [png(color_img(7))]
+    undecodable = [png(bgr_equal_img(0)), b"not an image", png(bgr_equal_img(2))]
+
+    input_path = str(tmp_path / "in.pkg.slp")
+    output_path = str(tmp_path / "out.pkg.slp")
+    write_pkg(input_path, [all_gray, late_color, undecodable])
+    rescale_pkg_slp.rescale_pkg_slp(input_path, output_path)
+    backends, frames = read_pkg(output_path)
+
+    # Every frame gray: stored single-channel, metadata says 1 channel
+    assert backends[0]["shape"] == [7, 12, 16, 1]
+    assert backends[0]["grayscale"] is True
+    assert all(img.shape == (12, 16) for img in frames[0])
+
+    # Colour frame after the first few: whole video stays colour
+    assert backends[1]["shape"] == [8, 12, 16, 3]
+    assert backends[1]["grayscale"] is False
+    assert all(img.shape == (12, 16, 3) for img in frames[1])
+
+    # Frame kept as original bytes: video is not marked single-channel
+    assert backends[2]["shape"] == [3, 12, 16, 3]
+    assert frames[2][1] is None
+    assert frames[2][0].shape == (12, 16, 3)
+    assert frames[2][2].shape == (12, 16, 3)
+
+
+def test_rescale_pkg_slp_metadata_without_grayscale_key(tmp_path, small_size, capsys):
+    all_gray = [png(bgr_equal_img(k)) for k in range(3)]
+    color = [png(color_img(k)) for k in range(3)]
+
+    input_path = str(tmp_path / "in.pkg.slp")
+    output_path = str(tmp_path / "out.pkg.slp")
+    # "video9" has no videos_json entry, so its frames keep their channels
+    write_pkg(input_path, [all_gray, color], grayscale_key=False,
+              extra_groups={"video9": [png(bgr_equal_img(0))]})
+    rescale_pkg_slp.rescale_pkg_slp(input_path, output_path)
+    out = capsys.readouterr().out
+    backends, frames = read_pkg(output_path)
+
+    assert "grayscale" not in backends[0]
+    assert backends[0]["shape"] == [3, 12, 16, 1]
+    assert backends[1]["shape"] == [3, 12, 16, 3]
+    assert "Video 0 (v0.mp4): [3, 8, 8, 3] -> [3, 12, 16, 1]" in out
+    assert "Video 1 (v1.mp4): [3, 8, 8, 3] -> [3, 12, 16, 3]" in out
+    assert "Updated 2 video metadata entries" in out
+
+    assert "video9 has no videos_json index" in out
+    with h5py.File(output_path, "r") as f:
+        img = cv2.imdecode(f["video9/video"][0], cv2.IMREAD_UNCHANGED)
+    assert img.shape == (12, 16, 3)